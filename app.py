@@ -55,6 +55,7 @@ OUTPUT_EXTENSIONS = {
     'pdf_to_docx': 'docx',
     'create_csv_from_excel': 'csv',
     'text_to_html': 'html',
+    'create_pdf_from_text': 'pdf',
     'image_to_text': 'txt'
 }
 
@@ -1,3 +1,4 @@
 # Import all converters to register them with the factory
 from conversions.image_converter import *
-from conversions.document_converter import *
\ No newline at end of file
+from conversions.document_converter import *
+from conversions.pdf_converter import *
\ No newline at end of file
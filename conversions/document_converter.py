@@ -1,17 +1,30 @@
 import os
+import re
+import html
 import pandas as pd
 import pytesseract
 from PIL import Image
 from core.converter_factory import ConverterFactory
+from conversions.pdf_converter import extract_page_texts
 import tempfile
+from itertools import islice
 from pathlib import Path
-from pypdf import PdfReader
 from docx import Document
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
 from docxcompose.composer import Composer
 from xhtml2pdf import pisa
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
 import openpyxl
 from openpyxl import Workbook
 
+# Blank lines (optionally holding whitespace) separate paragraphs in plain text
+_PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+
+# Userspace buffer for PDF output so reportlab's many small writes are batched
+_PDF_WRITE_BUFFER = 1 << 20
+
 
 def docx_to_pdf(docx_path, **kwargs):
     """Convert DOCX to PDF using external library"""
@@ -36,7 +49,7 @@ def html_to_pdf(html_input, output_path):
             html_content = html_input
 
         # Create PDF
-        with open(output_path, "w+b") as result_file:
+        with open(output_path, "wb", buffering=_PDF_WRITE_BUFFER) as result_file:
             pisa_status = pisa.CreatePDF(
                 src=html_content,
                 dest=result_file,
@@ -78,7 +91,7 @@ def excel_to_pdf(excel_path, **kwargs):
         """
 
         # Convert HTML to PDF
-        with open(output_path, "w+b") as result_file:
+        with open(output_path, "wb", buffering=_PDF_WRITE_BUFFER) as result_file:
             pisa_status = pisa.CreatePDF(src=html_content, dest=result_file, encoding='utf-8')
 
         if pisa_status.err:
@@ -89,6 +102,35 @@ def excel_to_pdf(excel_path, **kwargs):
         raise ValueError(f"Error converting Excel to PDF: {str(e)}")
 
 
+def _append_paragraph(body, text):
+    """Append an unstyled paragraph straight to the document body XML"""
+    p = OxmlElement('w:p')
+
+    if text:
+        r = OxmlElement('w:r')
+        # Mirror python-docx run text handling: line breaks become <w:br/>, tabs <w:tab/>
+        for i, line in enumerate(text.replace('\r', '\n').split('\n')):
+            if i:
+                r.append(OxmlElement('w:br'))
+            for j, chunk in enumerate(line.split('\t')):
+                if j:
+                    r.append(OxmlElement('w:tab'))
+                if chunk:
+                    t = OxmlElement('w:t')
+                    if chunk != chunk.strip():
+                        t.set(qn('xml:space'), 'preserve')
+                    t.text = chunk
+                    r.append(t)
+        p.append(r)
+
+    # Paragraphs must stay ahead of the trailing section properties
+    sect_pr = body.find(qn('w:sectPr'))
+    if sect_pr is not None:
+        sect_pr.addprevious(p)
+    else:
+        body.append(p)
+
+
 def pdf_to_docx(pdf_path, output_path=None, chunk_size=3):
     """Convert PDF to DOCX using a chunking approach"""
     try:
@@ -100,20 +142,22 @@ def pdf_to_docx(pdf_path, output_path=None, chunk_size=3):
         temp_dir = tempfile.mkdtemp()
         chunk_files = []
 
-        # Read the PDF
-        reader = PdfReader(pdf_path)
-        total_pages = len(reader.pages)
+        # Read all page text through PyMuPDF's C parser up front, so the PDF lock
+        # is released before any DOCX work starts
+        pages = enumerate(extract_page_texts(pdf_path))
 
         # Process the PDF in chunks
-        for start_page in range(0, total_pages, chunk_size):
+        while True:
+            chunk = list(islice(pages, chunk_size))
+            if not chunk:
+                break
             doc = Document()
-            end_page = min(start_page + chunk_size, total_pages)
+            start_page = chunk[0][0]
 
             # Process pages in this chunk
-            for page_num in range(start_page, end_page):
-                text = reader.pages[page_num].extract_text()
+            for page_num, text in chunk:
                 doc.add_heading(f"Page {page_num + 1}", level=2)
-                doc.add_paragraph(text)
+                _append_paragraph(doc.element.body, text)
 
             # Save this chunk
             chunk_path = os.path.join(temp_dir, f"chunk_{start_page}.docx")
@@ -189,9 +233,10 @@ def text_to_html(text_path, **kwargs):
         with open(text_path, 'r', encoding='utf-8') as f:
             text_content = f.read()
 
-        # Convert to simple HTML
-        paragraphs = text_content.split('\n\n')
-        formatted_paragraphs = "".join(f"<p>{paragraph}</p>" for paragraph in paragraphs if paragraph.strip())
+        # Convert to simple HTML, escaping markup in the source text
+        paragraphs = (paragraph.strip() for paragraph in _PARAGRAPH_BREAK.split(text_content))
+        formatted_paragraphs = "".join('<p>' + html.escape(paragraph) + '</p>' for paragraph in paragraphs if paragraph)
+        title = html.escape(title)
 
         html_content = f"""<!DOCTYPE html>
 <html>
@@ -219,6 +264,36 @@ def text_to_html(text_path, **kwargs):
         raise ValueError(f"Error converting text to HTML: {str(e)}")
 
 
+def create_pdf_from_text(text_path, **kwargs):
+    """Lay out a plain text file as a PDF, one text object per page"""
+    output_path = kwargs.get('output_path')
+    margin = 72
+    leading = 15
+
+    try:
+        with open(text_path, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+
+        pdf = canvas.Canvas(output_path, pagesize=letter)
+        top = letter[1] - margin
+        lines_per_page = int((top - margin) // leading)
+
+        # A single BT/ET text object per page instead of one drawString per line
+        for start in range(0, max(len(lines), 1), lines_per_page):
+            text = pdf.beginText(margin, top)
+            text.setFont("Helvetica", 12)
+            text.setLeading(leading)
+            for line in lines[start:start + lines_per_page]:
+                text.textLine(line)
+            pdf.drawText(text)
+            pdf.showPage()
+
+        pdf.save()
+        return output_path
+    except Exception as e:
+        raise ValueError(f"Error converting text to PDF: {str(e)}")
+
+
 def image_to_text(image_path, **kwargs):
     """Extract text from image using OCR"""
     output_path = kwargs.get('output_path')
@@ -243,4 +318,5 @@ ConverterFactory.register('excel_to_pdf', excel_to_pdf)
 ConverterFactory.register('pdf_to_docx', pdf_to_docx)
 ConverterFactory.register('create_csv_from_excel', create_csv_from_excel)
 ConverterFactory.register('text_to_html', text_to_html)
+ConverterFactory.register('create_pdf_from_text', create_pdf_from_text)
 ConverterFactory.register('image_to_text', image_to_text)
\ No newline at end of file
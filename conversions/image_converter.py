@@ -1,67 +1,231 @@
 import os
-from PIL import Image
+import shutil
+import functools
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PIL import Image, features
 from core.converter_factory import ConverterFactory
 
+# JPEG encode/decode relies on libjpeg-turbo's SIMD paths for speed
+if features.check_codec('jpg') and not features.check_feature('libjpeg_turbo'):
+    warnings.warn("Pillow is not linked against libjpeg-turbo; JPEG conversions will be slower", RuntimeWarning)
+
+# libvips is optional; it streams and flattens large images in its own threads
+try:
+    import pyvips
+    _USE_VIPS = True
+except (ImportError, OSError):
+    pyvips = None
+    _USE_VIPS = False
+
+# Output file extension for each Pillow format
+_FORMAT_EXT = {
+    'JPEG': '.jpg', 'PNG': '.png', 'GIF': '.gif',
+    'WEBP': '.webp', 'BMP': '.bmp', 'TIFF': '.tiff'
+}
+
+# Case-insensitive format names, including common extension aliases
+_FORMAT_ALIAS = {**{fmt.lower(): fmt for fmt in _FORMAT_EXT}, 'jpg': 'JPEG', 'tif': 'TIFF'}
+
+# Formats whose re-encode depends on the requested quality
+_LOSSY_FORMATS = ('JPEG', 'WEBP')
+
+# Output formats libvips can write without ImageMagick
+_VIPS_FORMATS = ('JPEG', 'TIFF')
+
+# Pillow save options per output format; lossy formats also get the requested quality
+_SAVE_OPTIONS = {
+    'JPEG': {'optimize': True},
+    'WEBP': {'optimize': True},
+}
+
+# Default PNG Deflate level: 1 encodes several times faster than zlib's default 6
+# (and than optimize=True's extra passes) for output that is roughly 10% larger
+_PNG_COMPRESS_LEVEL = 1
+
+# Image modes carrying transparency that JPEG cannot store
+_ALPHA_MODES = ('RGBA', 'LA', 'P', 'PA')
+
+
+def _flatten_alpha(img):
+    """Composite an image with transparency onto a white RGB background"""
+    arr = np.asarray(img if img.mode == 'RGBA' else img.convert('RGBA'))
+    rgb = arr[..., :3].astype(np.uint16)
+    alpha = arr[..., 3:4].astype(np.uint16)
+
+    # Integer alpha blend against white, rounded to nearest:
+    # (rgb * a + 255 * (255 - a) + 127) // 255, computed in place on the two working buffers
+    rgb *= alpha
+    np.subtract(255, alpha, out=alpha)
+    alpha *= 255
+    rgb += alpha
+    rgb += 127
+    rgb //= 255
+    return Image.fromarray(rgb.astype(np.uint8), 'RGB')
+
+
+def _prepare_jpeg(img):
+    """Flatten transparency onto white so the image can be saved as JPEG"""
+    return _flatten_alpha(img) if img.mode in _ALPHA_MODES else img
+
+
+def _prepare_gif(img):
+    """Quantize truecolor images to an adaptive palette, keeping 1-bit transparency"""
+    if img.mode == 'RGB':
+        return img.convert('P', palette=Image.Palette.ADAPTIVE, colors=256)
+
+    if img.mode in ('RGBA', 'LA', 'PA'):
+        # Reserve palette index 255 for pixels that are at most half opaque
+        alpha = np.asarray(img.getchannel('A'))
+        quantized = img.convert('RGB').convert('P', palette=Image.Palette.ADAPTIVE, colors=255)
+        mask = Image.fromarray(np.where(alpha <= 128, 255, 0).astype(np.uint8), 'L')
+        quantized.paste(255, mask=mask)
+        quantized.info['transparency'] = 255
+        return quantized
+
+    return img
+
+
+# Per-format step applied to the opened image before saving
+_PRE_SAVE = {
+    'JPEG': _prepare_jpeg,
+    'GIF': _prepare_gif,
+}
+
+
+def _resolve_output(input_path, output_format):
+    """Normalize the format name and build the output path next to the input"""
+    output_format = _FORMAT_ALIAS.get(output_format.lower(), output_format)
+    output_dir = os.path.dirname(input_path)
+    filename = os.path.splitext(os.path.basename(input_path))[0]
+    output_ext = _FORMAT_EXT.get(output_format, '.' + output_format.lower())
+    return output_format, os.path.join(output_dir, f"converted_{filename}{output_ext}")
+
+
+@functools.lru_cache(maxsize=32)
+def _make_saver(output_format, quality, png_level=_PNG_COMPRESS_LEVEL):
+    """Build a save function with one format's pre-save step and options resolved up front"""
+    prepare = _PRE_SAVE.get(output_format)
+    options = dict(_SAVE_OPTIONS.get(output_format, {}))
+    if output_format in _LOSSY_FORMATS:
+        options['quality'] = quality
+    elif output_format == 'PNG':
+        options['compress_level'] = png_level
+
+    def save(img, output_path):
+        if prepare:
+            img = prepare(img)
+        img.save(output_path, output_format, **options)
+
+    return save
+
+
+def _detect_format(input_path):
+    """Return the image format from the file header without decoding any pixels"""
+    try:
+        with Image.open(input_path) as img:
+            return img.format
+    except OSError:
+        return None
+
+
+def _convert_with_vips(input_path, output_path, output_format, quality):
+    """Convert an image with libvips, flattening transparency onto white for JPEG"""
+    img = pyvips.Image.new_from_file(input_path, access='sequential')
+
+    if output_format == 'JPEG':
+        if img.hasalpha():
+            # The background is in sample units, so white is 65535 for 16-bit images
+            img = img.flatten(background=65535 if img.format == 'ushort' else 255)
+        img.jpegsave(output_path, Q=quality, optimize_coding=True)
+    else:
+        img.tiffsave(output_path)
+
+
+def convert_image_obj(img, output_format, output, **kwargs):
+    """Convert an opened PIL image, writing to a path or a binary file object such as io.BytesIO"""
+    output_format = _FORMAT_ALIAS.get(output_format.lower(), output_format)
+    saver = _make_saver(output_format, kwargs.get('quality', 80), kwargs.get('png_level', _PNG_COMPRESS_LEVEL))
+    saver(img, output)
+    return output
+
 
 def convert_image(input_path, output_format, **kwargs):
     """Convert an image to a different format"""
     quality = kwargs.get('quality', 80)
 
-    # Define output path
-    output_dir = os.path.dirname(input_path)
-    filename = os.path.splitext(os.path.basename(input_path))[0]
-    output_ext = output_format.lower()
-    output_path = os.path.join(output_dir, f"converted_{filename}.{output_ext}")
+    output_format, output_path = _resolve_output(input_path, output_format)
+
+    # Input already in the target format: copy instead of decoding and re-encoding,
+    # unless a lossy re-encode was asked for with an explicit quality
+    if (not kwargs.get('force_reencode', False)
+            and _detect_format(input_path) == output_format
+            and (output_format not in _LOSSY_FORMATS or 'quality' not in kwargs)):
+        shutil.copyfile(input_path, output_path)
+        return output_path
+
+    if _USE_VIPS and output_format in _VIPS_FORMATS:
+        try:
+            _convert_with_vips(input_path, output_path, output_format, quality)
+            return output_path
+        except pyvips.Error:
+            pass  # Fall back to Pillow below
 
     # Open and convert the image
     with Image.open(input_path) as img:
-        # Convert to RGB if saving as JPEG
-        if output_format == 'JPEG' and img.mode in ('RGBA', 'LA'):
-            background = Image.new('RGB', img.size, (255, 255, 255))
-            background.paste(img, mask=img.split()[3])  # 3 is the alpha channel
-            img = background
-
-        # Save with appropriate parameters
-        if output_format in ('JPEG', 'WEBP'):
-            img.save(output_path, output_format, quality=quality, optimize=True)
-        elif output_format == 'PNG':
-            img.save(output_path, output_format, optimize=True)
-        else:
-            img.save(output_path, output_format)
+        convert_image_obj(img, output_format, output_path, **kwargs)
 
     return output_path
 
 
 def convert_from_gif(input_path, output_format, **kwargs):
     """Convert a GIF to another format (takes the first frame)"""
-    quality = kwargs.get('quality', 80)
-
-    # Define output path
-    output_dir = os.path.dirname(input_path)
-    filename = os.path.splitext(os.path.basename(input_path))[0]
-    output_ext = output_format.lower()
-    output_path = os.path.join(output_dir, f"converted_{filename}.{output_ext}")
+    output_format, output_path = _resolve_output(input_path, output_format)
 
     # Open GIF and get first frame
     with Image.open(input_path) as img:
         # Take first frame of the GIF
         img.seek(0)
+        convert_image_obj(img, output_format, output_path, **kwargs)
 
-        # Convert to RGB if needed
-        if output_format == 'JPEG' and img.mode in ('RGBA', 'LA', 'P'):
-            img = img.convert('RGB')
+    return output_path
 
-        # Save with appropriate parameters
-        if output_format in ('JPEG', 'WEBP'):
-            img.save(output_path, output_format, quality=quality, optimize=True)
-        elif output_format == 'PNG':
-            img.save(output_path, output_format, optimize=True)
-        else:
-            img.save(output_path, output_format)
 
-    return output_path
+def convert_multi(input_path, targets, **kwargs):
+    """Convert one image to several formats, decoding the source only once"""
+    output_paths = []
+
+    with Image.open(input_path) as img:
+        # First frame only for animated sources, decoded up front for every save
+        img.seek(0)
+        img.load()
+        for output_format in targets:
+            output_format, output_path = _resolve_output(input_path, output_format)
+            convert_image_obj(img, output_format, output_path, **kwargs)
+            output_paths.append(output_path)
+
+    return output_paths
+
+
+def convert_batch(input_paths, output_format, **kwargs):
+    """Convert several images to the same format in parallel"""
+    workers = kwargs.pop('workers', None) or os.cpu_count()
+    target_format = _FORMAT_ALIAS.get(output_format.lower(), output_format)
+
+    def convert_one(input_path):
+        # Animated GIFs only contribute their first frame to other formats
+        if input_path.lower().endswith('.gif') and target_format != 'GIF':
+            return convert_from_gif(input_path, target_format, **kwargs)
+        return convert_image(input_path, target_format, **kwargs)
+
+    # Pillow releases the GIL while decoding and encoding, so threads scale across cores
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(convert_one, input_paths))
 
 
 # Register converters with factory
 ConverterFactory.register('convert_image', convert_image)
-ConverterFactory.register('convert_from_gif', convert_from_gif)
\ No newline at end of file
+ConverterFactory.register('convert_from_gif', convert_from_gif)
+ConverterFactory.register('convert_multi', convert_multi)
+ConverterFactory.register('convert_batch', convert_batch)
\ No newline at end of file
@@ -1,4 +1,19 @@
-from typing import Callable, Dict
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+@dataclass
+class ConversionResult:
+    """Outcome of converting a single file in a batch"""
+    filename: str
+    status: str
+    elapsed_ms: float
+    output: Any = None
+    error: Optional[str] = None
+
 
 class ConverterFactory:
     """A factory class to manage different types of converters"""
@@ -12,11 +27,75 @@ class ConverterFactory:
     @classmethod
     def convert(cls, conversion_type: str, input_path: str, **kwargs):
         """Perform conversion using the registered converter"""
+        # One dict probe on the hot path; the miss is the exceptional case
+        try:
+            converter_func = cls._converters[conversion_type]
+        except KeyError:
+            raise ValueError(f"No converter registered for type: {conversion_type}") from None
+        return converter_func(input_path, **kwargs)
+
+    @classmethod
+    def convert_many(cls, conversion_type: str, input_paths: Iterable[str], workers: Optional[int] = None,
+                     progress: Optional[Callable[[int, int], None]] = None, output_dir: Optional[str] = None,
+                     output_ext: Optional[str] = None, **kwargs) -> List[ConversionResult]:
+        """Convert many files in parallel worker processes, returning results in input order
+
+        Converters that write next to their input (the image converters) need no output location.
+        Converters that take an output_path (the PDF and document converters) need output_dir:
+        each input gets its own subdirectory named after it, holding <name>_converted<output_ext>
+        (the input's extension by default), so page images and split parts never collide.
+        """
         if conversion_type not in cls._converters:
             raise ValueError(f"No converter registered for type: {conversion_type}")
-        return cls._converters[conversion_type](input_path, **kwargs)
+        if 'output_path' in kwargs:
+            raise ValueError("convert_many writes one output per input; pass output_dir instead of output_path")
+
+        input_paths = list(input_paths)
+        total = len(input_paths)
+        results = [None] * total
+        # Report progress roughly every 1% of the batch
+        step = max(total // 100, 1)
+
+        job_kwargs = [kwargs] * total
+        if output_dir is not None:
+            stems = [os.path.splitext(os.path.basename(input_path))[0] for input_path in input_paths]
+            if len(set(stems)) != total:
+                raise ValueError("convert_many needs distinct input file names when output_dir is given")
+            job_kwargs = []
+            for stem, input_path in zip(stems, input_paths):
+                input_dir = os.path.join(output_dir, stem)
+                os.makedirs(input_dir, exist_ok=True)
+                ext = output_ext or os.path.splitext(input_path)[1]
+                job_kwargs.append({**kwargs, 'output_path': os.path.join(input_dir, f"{stem}_converted{ext}")})
+
+        with ProcessPoolExecutor(max_workers=workers or min(os.cpu_count() or 1, 8)) as executor:
+            # Workers get the converter name, not the callable, so nothing needs pickling
+            futures = {
+                executor.submit(_dispatch, conversion_type, input_path, job_kwargs[index]): index
+                for index, input_path in enumerate(input_paths)
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                results[futures[future]] = future.result()
+                if progress and (done % step == 0 or done == total):
+                    progress(done, total)
+
+        return results
 
     @classmethod
     def get_converters(cls):
         """Return all registered converters"""
-        return cls._converters
\ No newline at end of file
+        return cls._converters
+
+
+def _dispatch(conversion_type: str, input_path: str, kwargs: Dict[str, Any]) -> ConversionResult:
+    """Run one conversion inside a worker process and capture its outcome"""
+    if conversion_type not in ConverterFactory._converters:
+        # Spawned workers start with an empty registry; importing the converters fills it
+        import conversions  # noqa: F401
+
+    start = time.perf_counter()
+    try:
+        output = ConverterFactory.convert(conversion_type, input_path, **kwargs)
+        return ConversionResult(input_path, 'success', (time.perf_counter() - start) * 1000, output=output)
+    except Exception as e:
+        return ConversionResult(input_path, 'error', (time.perf_counter() - start) * 1000, error=str(e))
\ No newline at end of file